@@ -3,13 +3,102 @@ Classes for reading and analyzing Crowdstreet transactions
 """
 
 import csv
-from datetime import date, datetime
-from logging import getLogger
+import io
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date
+from itertools import accumulate
+from logging import DEBUG, getLogger
 from pathlib import Path
+from sys import intern
 
 LOGGER = getLogger()
 ENCODING = "utf8"
+# reports smaller than this are read into memory with a single read
+READ_ALL_SIZE = 100 * 1024 * 1024
+BUFFER_SIZE = 1024 * 1024
+# maximum number of cached filter results (and of cached sums) per portfolio
+QUERY_CACHE_SIZE = 1024
 TX_ARGS = ("investing_entity", "sponsor", "offering", "start_date", "end_date")
+# dollar amount columns stored (as integer cents, or as float dollars once an
+# amount with fractional cents is added) alongside the Transaction objects for
+# fast, exact aggregation
+COLUMNS = (
+    "capital_committed",
+    "capital_contributed",
+    "capital",
+    "total_distribution",
+    "return_of_capital",
+    "return_on_capital",
+)
+# Portfolio aggregator methods and the column each one sums
+AGGREGATES = {
+    "capital_committed": "capital_committed",
+    "capital_contributed": "capital_contributed",
+    "capital_balance": "capital",
+    "distributions": "total_distribution",
+    "return_of_capital": "return_of_capital",
+    "return_on_capital": "return_on_capital",
+}
+
+
+_DATE_CACHE = {}
+
+
+def _parse_date(datestr):
+    """
+    Return datetime.date for a "%Y-%m-%d" string, caching repeated dates
+    """
+    try:
+        return _DATE_CACHE[datestr]
+    except KeyError:
+        parsed = date.fromisoformat(datestr)
+        return _DATE_CACHE.setdefault(datestr, parsed)
+
+
+def _open_report(fname):
+    """
+    Return text file object for a report, read into memory in one call unless
+    the file is larger than READ_ALL_SIZE
+    """
+    path = Path(fname)
+    if path.stat().st_size < READ_ALL_SIZE:
+        return io.StringIO(path.read_text(encoding=ENCODING))
+    return open(fname, encoding=ENCODING, buffering=BUFFER_SIZE)
+
+
+def _delimiter(fname):
+    """
+    Return field delimiter for a report: tab for .tsv files, otherwise comma
+    """
+    return "\t" if fname.endswith("tsv") else ","
+
+
+def _padded_rows(csv_file, width):
+    """
+    Yield non-empty rows, padding short rows with None like csv.DictReader
+    """
+    for row in csv_file:
+        if len(row) < width:
+            if not row:
+                continue
+            row += [None] * (width - len(row))
+        yield row
+
+
+@contextmanager
+def _open_reader(fname):
+    """
+    Open a report and yield (columns, rows), where columns maps header names to
+    positions and rows iterates the remaining rows as lists
+    """
+    with _open_report(fname) as fid:
+        csv_file = csv.reader(fid, delimiter=_delimiter(fname))
+        header = next(csv_file, [])
+        columns = {name: idx for idx, name in enumerate(header)}
+        yield columns, _padded_rows(csv_file, len(header))
 
 
 class PortfolioException(Exception):
@@ -58,50 +147,123 @@ class Transaction:
     - withholdings
     """
 
-    def __init__(self, line):
+    __slots__ = (
+        "sponsor",
+        "offering",
+        "investing_entity",
+        "transaction_type",
+        "description",
+        "id",
+        "date",
+        "distribution_date",
+        "capital",
+        "total_distribution",
+        "return_on_capital",
+        "return_of_capital",
+        "withholdings",
+        "_repr",
+        "_cells",
+    )
+
+    def __init__(self, line, columns=None):
+        """
+        line is a row read from either a contribution report or distribution report,
+        either as a list indexed via columns (dict of header name to position), or
+        as a dict keyed by header name when columns is None
+        """
+        if columns is None:
+            columns = {name: name for name in line}
+        if "Capital Contribution Amount" in columns:
+            self._read_contribution(line, columns)
+        elif "Return on Capital" in columns:
+            self._read_distribution(line, columns)
+        else:
+            raise TransactionException(f"Unknown report format for this data: {line}")
+
+    @classmethod
+    def from_contribution(cls, line, columns):
+        """
+        Return Transaction for a row of a contribution report, where columns maps
+        header names to positions in line
+        """
+        txn = cls.__new__(cls)
+        txn._read_contribution(line, columns)
+        return txn
+
+    @classmethod
+    def from_distribution(cls, line, columns):
         """
-        line is a dict read from either a contribution report or distribution report
+        Return Transaction for a row of a distribution report, where columns maps
+        header names to positions in line
         """
-        self.sponsor = line["Sponsor"]
-        self.offering = line["Offering"]
-        self.investing_entity = line["Investing Entity"]
-        msg = ""
+        txn = cls.__new__(cls)
+        txn._read_distribution(line, columns)
+        return txn
+
+    def _read_contribution(self, line, columns):
+        """Set properties from a contribution report row"""
+        # names are interned: they repeat on every row and are used as index keys
+        # formatted output is cached since transactions are not modified once read
+        self._repr = None
+        self._cells = None
         try:
-            if "Capital Contribution Amount" in line:  # contribution
-                self.transaction_type = "Contribution"
-                self.description = line["Transaction Description"]
-                self.id = int(line["Capital Contribution ID"])
-                datestr = line["Transaction Date"]
-                self.date = datetime.strptime(datestr, "%Y-%m-%d").date()
-                # contributions are negative
-                self.capital = -float(line["Capital Contribution Amount"])
-                msg = f"Adding ${self.capital:11.02f} {self.transaction_type} "
-            if "Return on Capital" in line:  # distribution
-                self.transaction_type = "Distribution"
-                self.description = line["Description"]
-                self.id = int(line["Distribution ID"])
-                datestr = line["Period End Date"]
-                self.date = datetime.strptime(datestr, "%Y-%m-%d").date()
-                datestr = line["Period End Date"]
-                self.distribution_date = datetime.strptime(datestr, "%Y-%m-%d").date()
-                self.total_distribution = float(line["Total Distribution"])
-                val = line["Return of Capital"]
-                self.return_of_capital = float(val) if val else 0
-                self.capital = self.return_of_capital
-                val = line["Return on Capital"]
-                self.return_on_capital = float(val) if val else 0
-                val = line["Withholdings"]
-                self.withholdings = float(val) if val else 0
-                msg = (
-                    f"Adding ${self.total_distribution:11.02f} {self.transaction_type} "
-                )
+            self.sponsor = intern(line[columns["Sponsor"]])
+            self.offering = intern(line[columns["Offering"]])
+            self.investing_entity = intern(line[columns["Investing Entity"]])
+            self.transaction_type = "Contribution"
+            self.description = line[columns["Transaction Description"]]
+            self.id = int(line[columns["Capital Contribution ID"]])
+            self.date = _parse_date(line[columns["Transaction Date"]])
+            # contributions are negative
+            self.capital = -float(line[columns["Capital Contribution Amount"]])
+        except Exception as e:
+            msg = f"Problem reading this data: {line}\nerror={str(e)}"
+            raise TransactionException(msg) from e
+        self._log_added(self.capital)
+
+    def _read_distribution(self, line, columns):
+        """Set properties from a distribution report row"""
+        self._repr = None
+        self._cells = None
+        try:
+            self.sponsor = intern(line[columns["Sponsor"]])
+            self.offering = intern(line[columns["Offering"]])
+            self.investing_entity = intern(line[columns["Investing Entity"]])
+            self.transaction_type = "Distribution"
+            self.description = line[columns["Description"]]
+            self.id = int(line[columns["Distribution ID"]])
+            self.date = _parse_date(line[columns["Period End Date"]])
+            self.distribution_date = self.date
+            self.total_distribution = float(line[columns["Total Distribution"]])
+            val = line[columns["Return of Capital"]]
+            self.return_of_capital = float(val) if val else 0
+            self.capital = self.return_of_capital
+            val = line[columns["Return on Capital"]]
+            self.return_on_capital = float(val) if val else 0
+            val = line[columns["Withholdings"]]
+            self.withholdings = float(val) if val else 0
         except Exception as e:
             msg = f"Problem reading this data: {line}\nerror={str(e)}"
             raise TransactionException(msg) from e
-        LOGGER.debug(msg + f"from {self.sponsor!r} on {self.offering!r} offering")
+        self._log_added(self.total_distribution)
+
+    def _log_added(self, amount):
+        """Debug log a newly read transaction"""
+        if LOGGER.isEnabledFor(DEBUG):
+            LOGGER.debug(
+                "Adding $%11.02f %s from %r on %r offering",
+                amount,
+                self.transaction_type,
+                self.sponsor,
+                self.offering,
+            )
 
     def __repr__(self):
-        return f"{self.date}  {self.transaction_type}  ${self.capital:10.02f}"
+        if self._repr is None:
+            self._repr = (
+                f"{self.date}  {self.transaction_type}  ${self.capital:10.02f}"
+            )
+        return self._repr
 
     HEADERS = [
         "investing_entity",
@@ -118,13 +280,16 @@ class Transaction:
         "withholdings",
     ]
 
-    def headers(self, delimiter="\t"):
+    @classmethod
+    def headers(cls, delimiter="\t"):
         """Return column headers as delimited string"""
-        return delimiter.join([h.title().replace("_", " ") for h in self.HEADERS])
+        return delimiter.join([h.title().replace("_", " ") for h in cls.HEADERS])
 
     def to_tsv(self, delimiter="\t"):
         """Return transaction as delimited string"""
-        return delimiter.join([str(getattr(self, h, "")) for h in self.HEADERS])
+        if self._cells is None:
+            self._cells = [str(getattr(self, h, "")) for h in self.HEADERS]
+        return delimiter.join(self._cells)
 
 
 class Portfolio:
@@ -140,131 +305,241 @@ class Portfolio:
         self.offerings = set()
         self.investing_entities = set()
         self._transactions = []
+        self._ids = set()
+        # transaction dates as proleptic Gregorian ordinals, for int comparisons
+        self._days = array("l")
+        self._first_day = date.max.toordinal()
+        self._last_day = date.min.toordinal()
+        self._keys = []
+        self._sponsors_by_offering = {}
+        self._position_cache = {}
+        self._total_cache = {}
+        # positions sorted by date (built on demand) for date range lookups
+        self._day_order = None
+        self._sorted_days = []
+        # cumulative column sums in self._day_order order, built on demand
+        self._prefix_sums = {}
+        self._columns = {column: array("q") for column in COLUMNS}
+        self._cents = True
+        # positions into self._transactions, keyed by attribute value
+        self._index = {
+            attr: defaultdict(list)
+            for attr in ("investing_entity", "sponsor", "offering")
+        }
         self.start_date = date.today()
-        with open(fname, encoding=ENCODING) as fid:
-            LOGGER.info(f"Reading contribution data from {fname!r}")
-            delimiter = ","
-            if fname.endswith("tsv"):
-                delimiter = "\t"
-            csv_file = csv.DictReader(fid, delimiter=delimiter)
-            for line in csv_file:
-                if "Capital Contribution Amount" not in line:
-                    # this is reading the header line
-                    raise PortfolioException(
-                        f"{fname!r} does not appear to be a Crowdstreet Capital "
-                        + "Contribution report"
-                    )
-                self.offerings.add(line["Offering"])
-                self.sponsors.add(line["Sponsor"])
-                self.investing_entities.add(line["Investing Entity"])
-                ids = [t.id for t in self.transactions()]
-                txn = Transaction(line)
-                if txn.id in ids:
-                    LOGGER.warning(f"Skipping duplicate transaction: {txn}")
+        LOGGER.info(f"Reading contribution data from {fname!r}")
+        with _open_reader(fname) as (columns, rows):
+            if "Capital Contribution Amount" not in columns:
+                raise PortfolioException(
+                    f"{fname!r} does not appear to be a Crowdstreet Capital "
+                    + "Contribution report"
+                )
+            offering = columns["Offering"]
+            sponsor = columns["Sponsor"]
+            entity = columns["Investing Entity"]
+            for line in rows:
+                self.offerings.add(line[offering])
+                self.sponsors.add(line[sponsor])
+                self.investing_entities.add(line[entity])
+                txn = Transaction.from_contribution(line, columns)
+                if txn.id in self._ids:
+                    LOGGER.warning("Skipping duplicate transaction: %s", txn)
                     continue
                 if txn.date < self.start_date:
                     self.start_date = txn.date
-                self._transactions.append(txn)
+                self._add_transaction(txn)
 
     def read_distributions(self, fname):
         """
         Add data from "Distributions" report to portfolio
+        Nothing is added if any distribution in the report is invalid
         """
-        with open(fname, encoding=ENCODING) as fid:
-            LOGGER.info(f"Adding distributions from {fname!r}")
-            delimiter = ","
-            if fname.endswith("tsv"):
-                delimiter = "\t"
-            csv_file = csv.DictReader(fid, delimiter=delimiter)
-            for line in csv_file:
-                if "Distribution ID" not in line:
-                    raise DistributionException(
-                        f"{fname!r} does not appear to be a Crowdstreet Distribution report"
-                    )
-                if line["Sponsor"] not in self.sponsors:
+        LOGGER.info(f"Adding distributions from {fname!r}")
+        txns = []
+        with _open_reader(fname) as (columns, rows):
+            if "Distribution ID" not in columns:
+                raise DistributionException(
+                    f"{fname!r} does not appear to be a Crowdstreet Distribution report"
+                )
+            offering = columns["Offering"]
+            sponsor = columns["Sponsor"]
+            entity = columns["Investing Entity"]
+            for line in rows:
+                if line[sponsor] not in self.sponsors:
                     raise DistributionException(
-                        f"Sponsor {line['Sponsor']!r} not one of {self.sponsors}"
+                        f"Sponsor {line[sponsor]!r} not one of {self.sponsors}"
                     )
-                if line["Offering"] not in self.offerings:
+                if line[offering] not in self.offerings:
                     raise DistributionException(
-                        f"Offering={line['Offering']!r} not one of {self.offerings}"
+                        f"Offering={line[offering]!r} not one of {self.offerings}"
                     )
-                if (
-                    line["Investing Entity"] not in self.investing_entities
-                ):  # pragma: no cover
+                if line[entity] not in self.investing_entities:  # pragma: no cover
                     raise DistributionException(
-                        f"Entity {line['Investing Entity']!r} not one of {self.investing_entities}"
+                        f"Entity {line[entity]!r} not one of {self.investing_entities}"
                     )
-                ids = [t.id for t in self.transactions()]
-                txn = Transaction(line)
-                if txn.id in ids:
-                    LOGGER.warning(f"Skipping duplicate transaction: {txn}")
-                    continue
-                self._transactions.append(txn)
+                txns.append(Transaction.from_distribution(line, columns))
+        # only add distributions once the whole report has been read and checked
+        for txn in txns:
+            if txn.id in self._ids:
+                LOGGER.warning("Skipping duplicate transaction: %s", txn)
+                continue
+            self._add_transaction(txn)
+
+    @contextmanager
+    def without_sponsor(self, sponsor):
+        """
+        Context manager removing sponsor from the known sponsors, so that
+        read_distributions() rejects its distributions, and restoring it on exit
+        """
+        with self._without(self.sponsors, sponsor):
+            yield
+
+    @contextmanager
+    def without_offering(self, offering):
+        """
+        Context manager removing offering from the known offerings, so that
+        read_distributions() rejects its distributions, and restoring it on exit
+        """
+        with self._without(self.offerings, offering):
+            yield
+
+    @staticmethod
+    @contextmanager
+    def _without(values, value):
+        """
+        Discard value from the values set, adding it back on exit if it was there
+        """
+        present = value in values
+        values.discard(value)
+        try:
+            yield
+        finally:
+            if present:
+                values.add(value)
+
+    def _add_transaction(self, txn):
+        """
+        Append transaction and update the id set and lookup indexes
+        """
+        position = len(self._transactions)
+        self._position_cache.clear()
+        self._total_cache.clear()
+        self._day_order = None
+        self._transactions.append(txn)
+        self._ids.add(txn.id)
+        day = txn.date.toordinal()
+        self._days.append(day)
+        self._first_day = min(self._first_day, day)
+        self._last_day = max(self._last_day, day)
+        self._keys.append((txn.investing_entity, txn.offering))
+        self._sponsors_by_offering.setdefault(txn.offering, txn.sponsor)
+        for attr, index in self._index.items():
+            index[getattr(txn, attr)].append(position)
+        contributed = txn.capital if txn.transaction_type == "Contribution" else 0
+        committed = contributed if txn.description != "Capital Call" else 0
+        amounts = [committed, contributed]
+        amounts.extend(getattr(txn, column, 0) for column in COLUMNS[2:])
+        if self._cents and any(round(amount, 2) != amount for amount in amounts):
+            self._use_dollars()
+        for column, amount in zip(COLUMNS, amounts):
+            self._columns[column].append(round(amount * 100) if self._cents else amount)
+
+    def _use_dollars(self):
+        """
+        Convert the integer cent columns to float dollars, so that amounts with
+        fractional cents are summed before rounding, not rounded one by one
+        """
+        LOGGER.info("Fractional cent amount found: summing amounts as floats")
+        self._cents = False
+        self._columns = {
+            column: array("d", [value / 100 for value in values])
+            for column, values in self._columns.items()
+        }
+
+    def _total(self, column, **kwargs):
+        """
+        Return sum of dollar amount column over the filtered transactions as float
+        """
+        key = self._query_key(kwargs)
+        try:
+            return self._total_cache[column, key]
+        except KeyError:
+            pass
+        if len(self._total_cache) >= QUERY_CACHE_SIZE:
+            self._total_cache.clear()
+        if key[:3] == (None, None, None):
+            total = self._date_range_total(column, key[3], key[4])
+        else:
+            total = self._sum(self._columns[column], self._cached_positions(key))
+        self._total_cache[column, key] = total
+        return total
+
+    def _sum(self, values, positions):
+        """
+        Return sum in dollars of column values at positions, or of all values if
+        positions is None
+        """
+        if positions is None:
+            return self._dollars(sum(values))
+        return self._dollars(sum(map(values.__getitem__, positions)))
+
+    def _dollars(self, total):
+        """
+        Return column total in dollars, rounded to cents as returned by the
+        aggregators and written to summaries
+        """
+        return round(total / 100 if self._cents else total, 2)
 
     def capital_committed(self, **kwargs):
         """
         Return capital committed as float
         """
-        txns = self.transactions(**kwargs)
-        txns = [
-            t
-            for t in self.transactions(**kwargs)
-            if t.transaction_type == "Contribution" and t.description != "Capital Call"
-        ]
-        return round(sum([t.capital for t in txns]), 2)
+        return self._total("capital_committed", **kwargs)
 
     def capital_contributed(self, **kwargs):
         """
         Return capital contributed as float
         """
-        txns = self.transactions(**kwargs)
-        txns = [
-            t
-            for t in self.transactions(**kwargs)
-            if t.transaction_type == "Contribution"
-        ]
-        return round(sum([t.capital for t in txns]), 2)
+        return self._total("capital_contributed", **kwargs)
 
     def capital_balance(self, **kwargs):
         """
         Return capital balance as float
         """
-        txns = self.transactions(**kwargs)
-        return round(sum([t.capital for t in txns]), 2)
+        return self._total("capital", **kwargs)
 
     def return_of_capital(self, **kwargs):
         """
         Return sum of capital returned float
         """
-        txns = [
-            t
-            for t in self.transactions(**kwargs)
-            if t.transaction_type == "Distribution"
-        ]
-        return round(sum([t.return_of_capital for t in txns]), 2)
+        return self._total("return_of_capital", **kwargs)
 
     def return_on_capital(self, **kwargs):
         """
         Return sum of return on capital as float
         """
-        txns = [
-            t
-            for t in self.transactions(**kwargs)
-            if t.transaction_type == "Distribution"
-        ]
-        return round(sum([t.return_on_capital for t in txns]), 2)
+        return self._total("return_on_capital", **kwargs)
 
     def distributions(self, **kwargs):
         """
         Return sum of total distributions as float
         """
-        txns = [
-            t
-            for t in self.transactions(**kwargs)
-            if t.transaction_type == "Distribution"
-        ]
-        return round(sum([t.total_distribution for t in txns]), 2)
+        return self._total("total_distribution", **kwargs)
+
+    def totals(self, **kwargs):
+        """
+        Return dict of all aggregated sums as floats, keyed by aggregator name
+        ("capital_committed", "capital_contributed", "capital_balance",
+        "distributions", "return_of_capital", "return_on_capital"), filtering
+        the transactions only once
+
+        Keyword arguments are the same as for transactions()
+        """
+        positions = self._positions(**kwargs)
+        return {
+            name: self._sum(self._columns[column], positions)
+            for name, column in AGGREGATES.items()
+        }
 
     def transactions(self, **kwargs):
         """
@@ -280,23 +555,124 @@ class Portfolio:
         end_date:          datetime.date Only include trasacations up until this date
                            (inclusive)
         """
+        positions = self._positions(**kwargs)
+        if positions is None:
+            return self._transactions[:]
+        return [self._transactions[i] for i in positions]
+
+    def to_tsv_lines(self, delimiter="\t", **kwargs):
+        """
+        Return list of delimited strings: the transaction headers followed by
+        one line per transaction
+
+        Keyword arguments are the same as for transactions()
+        """
+        lines = [Transaction.headers(delimiter)]
+        lines.extend(txn.to_tsv(delimiter) for txn in self.transactions(**kwargs))
+        return lines
+
+    def _positions(self, **kwargs):
+        """
+        Return tuple of positions in self._transactions matching the keyword
+        arguments of transactions(), or None when every transaction matches
+        """
+        return self._cached_positions(self._query_key(kwargs))
+
+    def _query_key(self, kwargs):
+        """
+        Return (investing_entity, sponsor, offering, first, last) cache key for the
+        keyword arguments of transactions(), with the date range as date ordinals
+        """
         for key in kwargs:
             if key not in TX_ARGS:
                 raise UnknownTransactionArgument(key)
+        return (
+            kwargs.get("investing_entity"),
+            kwargs.get("sponsor"),
+            kwargs.get("offering"),
+            (kwargs.get("start_date") or self.start_date).toordinal(),
+            (kwargs.get("end_date") or date.today()).toordinal(),
+        )
+
+    def _cached_positions(self, key):
+        """
+        Return positions for a _query_key() key, cached until the next
+        transaction is added
+        """
+        try:
+            return self._position_cache[key]
+        except KeyError:
+            pass
+        if len(self._position_cache) >= QUERY_CACHE_SIZE:
+            self._position_cache.clear()
+        positions = self._find_positions(key[:3], key[3], key[4])
+        self._position_cache[key] = positions
+        return positions
+
+    def _find_positions(self, values, first, last):
+        """
+        Return tuple of positions matching the (investing_entity, sponsor,
+        offering) values (None matches anything) between the first and last
+        date ordinals (inclusive), or None when every transaction matches
+        """
+        filters = [
+            (attr, value, self._index[attr].get(value, ()))
+            for attr, value in zip(self._index, values)
+            if value is not None
+        ]
+        in_range = first <= self._first_day and self._last_day <= last
+        if not filters:
+            return None if in_range else self._date_range(first, last)
+        # start from the most selective index (its positions are in transaction
+        # order) and check the remaining filters on those survivors only
+        filters.sort(key=lambda f: len(f[2]))
+        positions = filters[0][2]
         txns = self._transactions
-        for attr in ("investing_entity", "sponsor", "offering"):
-            if attr in kwargs and kwargs.get(attr) is not None:
-                txns = [t for t in txns if getattr(t, attr) == kwargs.get(attr)]
-        if "start_date" in kwargs and kwargs.get("start_date"):
-            start_date = kwargs.get("start_date")
-        else:
-            start_date = self.start_date
-        if "end_date" in kwargs and kwargs.get("end_date"):
-            end_date = kwargs.get("end_date")
-        else:
-            end_date = date.today()
-        txns = [t for t in txns if t.date >= start_date and t.date <= end_date]
-        return txns
+        for attr, value, _ in filters[1:]:
+            positions = [i for i in positions if getattr(txns[i], attr) == value]
+        if in_range:
+            return tuple(positions)
+        days = self._days
+        return tuple(i for i in positions if first <= days[i] <= last)
+
+    def _date_range(self, first, last):
+        """
+        Return tuple of positions (in transaction order) dated between the first
+        and last date ordinals (inclusive), using binary search over the dates
+        """
+        lo, hi = self._day_bounds(first, last)
+        return tuple(sorted(self._day_order[lo:hi]))
+
+    def _day_bounds(self, first, last):
+        """
+        Return (lo, hi) slice of self._day_order dated between the first and last
+        date ordinals (inclusive), sorting positions by date if needed
+        """
+        if self._day_order is None:
+            self._day_order = sorted(
+                range(len(self._transactions)), key=self._days.__getitem__
+            )
+            self._sorted_days = [self._days[i] for i in self._day_order]
+            self._prefix_sums = {}
+        lo = bisect_left(self._sorted_days, first)
+        # an empty range when first is after last
+        hi = max(bisect_right(self._sorted_days, last), lo)
+        return lo, hi
+
+    def _date_range_total(self, column, first, last):
+        """
+        Return sum in dollars of column between the first and last date ordinals
+        (inclusive) from cumulative sums over the date-sorted transactions
+        """
+        lo, hi = self._day_bounds(first, last)
+        sums = self._prefix_sums.get(column)
+        if sums is None:
+            values = self._columns[column]
+            sums = list(
+                accumulate(map(values.__getitem__, self._day_order), initial=0)
+            )
+            self._prefix_sums[column] = sums
+        return self._dollars(sums[hi] - sums[lo])
 
     HEADER = [
         "Entity",
@@ -323,77 +699,71 @@ class Portfolio:
           2:  summarize each offering individually
         """
         rows = []
-        if start_date:
-            start_str = start_date.strftime("%Y-%m-%d")
-        else:
-            start_str = self.start_date.strftime("%Y-%m-%d")
-        if end_date:
-            end_str = end_date.strftime("%Y-%m-%d")
-        else:
-            end_str = date.today().strftime("%Y-%m-%d")
-        if verbose == 0:
-            entities = [None]
-            offerings = [None]
-        elif verbose == 1:
-            entities = sorted(self.investing_entities)
-            offerings = [None]
-        elif verbose == 2:
-            entities = sorted(self.investing_entities)
-            offerings = sorted(self.offerings)
-
-        for entity in entities:
-            for offering in offerings:
-                ccom = self.capital_committed(
-                    investing_entity=entity, offering=offering, end_date=end_date
-                )
-                ccon = self.capital_contributed(
-                    investing_entity=entity, offering=offering, end_date=end_date
-                )
-                if not ccon:
-                    continue
-                cb = self.capital_balance(
-                    investing_entity=entity, offering=offering, end_date=end_date
-                )
-                dist = self.distributions(
-                    investing_entity=entity,
-                    offering=offering,
-                    start_date=start_date,
-                    end_date=end_date,
-                )
-                rofc = self.return_of_capital(
-                    investing_entity=entity,
-                    offering=offering,
-                    start_date=start_date,
-                    end_date=end_date,
-                )
-                ronc = self.return_on_capital(
-                    investing_entity=entity,
-                    offering=offering,
-                    start_date=start_date,
-                    end_date=end_date,
-                )
-                entity = "ALL" if not entity else entity
-                offering = "ALL" if not offering else offering
-                sponsor = "ALL"
-                if offering != "ALL":
-                    sponsor = self.transactions(offering=offering)[0].sponsor
-                rows.append(
-                    [
-                        entity,
-                        sponsor,
-                        offering,
-                        ccom,
-                        ccon,
-                        cb,
-                        dist,
-                        rofc,
-                        ronc,
-                        start_str,
-                        end_str,
-                    ]
-                )
+        lower = start_date if start_date else self.start_date
+        upper = end_date if end_date else date.today()
+        start_str = lower.strftime("%Y-%m-%d")
+        end_str = upper.strftime("%Y-%m-%d")
+        if verbose not in (0, 1, 2):
+            raise ValueError(f"verbose must be 0, 1 or 2, not {verbose!r}")
+
+        totals = self._summary_totals(verbose, lower.toordinal(), upper.toordinal())
+
+        # only (entity, offering) pairs with transactions have totals
+        for (entity, offering), total in sorted(totals.items()):
+            if not total[1]:
+                continue
+            entity = "ALL" if not entity else entity
+            offering = "ALL" if not offering else offering
+            sponsor = "ALL"
+            if offering != "ALL":
+                sponsor = self._sponsors_by_offering[offering]
+            rows.append(
+                [entity, sponsor, offering]
+                + [self._dollars(t) for t in total]
+                + [start_str, end_str]
+            )
         return rows
 
+    def _summary_totals(self, verbose, lower_day, upper_day):
+        """
+        Return dict of (entity, offering) summary keys (None for "ALL") to
+        [committed, contributed, balance, distributed, rofc, ronc] column totals,
+        from a single pass over the transaction columns
+        """
+        totals = defaultdict(lambda: [0] * 6)
+        first = self.start_date.toordinal()
+        columns = [self._columns[column] for column in COLUMNS]
+        for day, (entity, offering), amounts in zip(
+            self._days, self._keys, zip(*columns)
+        ):
+            if day > upper_day:
+                continue
+            total = totals[
+                (
+                    entity if verbose >= 1 else None,
+                    offering if verbose == 2 else None,
+                )
+            ]
+            # capital columns count from the portfolio start, distributions
+            # from the requested start date
+            if day >= first:
+                total[0] += amounts[0]
+                total[1] += amounts[1]
+                total[2] += amounts[2]
+            if day >= lower_day:
+                total[3] += amounts[3]
+                total[4] += amounts[4]
+                total[5] += amounts[5]
+        return totals
+
+    def _format_rows(self, rows):
+        """
+        Yield summary rows with the dollar amount columns ("Capital Committed"
+        through "Return on Capital") formatted with 2 decimal places
+        """
+        for row in rows:
+            yield row[:3] + [f"{value:.2f}" for value in row[3:9]] + row[9:]
+
     def save_summary(
         self, fname, delimiter="\t", verbose=2, start_date=None, end_date=None
     ):
@@ -411,13 +781,14 @@ class Portfolio:
           1:  summarize each investment entity individually
           2:  summarize each offering individually
         """
-        rows = [self.HEADER] + self._summary(verbose, start_date, end_date)
+        summary = self._summary(verbose, start_date, end_date)
         Path(fname).parent.mkdir(parents=True, exist_ok=True)
         with open(fname, "w", encoding=ENCODING) as fid:
             csv_file = csv.writer(
                 fid, delimiter=delimiter, quotechar='"', quoting=csv.QUOTE_MINIMAL
             )
-            for row in rows:
-                csv_file.writerow(row)
-        LOGGER.info(f"Summary with {len(rows)} rows written to {fname!r}")
-        return len(rows)
+            csv_file.writerow(self.HEADER)
+            csv_file.writerows(self._format_rows(summary))
+        nrows = len(summary) + 1
+        LOGGER.info(f"Summary with {nrows} rows written to {fname!r}")
+        return nrows
@@ -18,20 +18,23 @@ def main():
     for year in range(portfolio.start_date.year, date.today().year + 1):
         start_date = date(year, 1, 1)
         end_date = date(year, 12, 31)
-        rofc = portfolio.return_of_capital(start_date=start_date, end_date=end_date)
-        ronc = portfolio.return_on_capital(start_date=start_date, end_date=end_date)
-        ccom = portfolio.capital_committed(end_date=end_date)
-        ccon = portfolio.capital_contributed(end_date=end_date)
-        cbal = portfolio.capital_balance(end_date=end_date)
+        returns = portfolio.totals(start_date=start_date, end_date=end_date)
+        rofc = returns["return_of_capital"]
+        ronc = returns["return_on_capital"]
+        capital = portfolio.totals(end_date=end_date)
+        ccom = capital["capital_committed"]
+        ccon = capital["capital_contributed"]
+        cbal = capital["capital_balance"]
         print(
             f"{year}\t${ccom:16.2f}\t${ccon:17.2f}\t${cbal:14.2f}\t"
             + f"${rofc:16.2f}\t${ronc:16.2f}"
         )
-    rofc = portfolio.return_of_capital()
-    ronc = portfolio.return_on_capital()
-    ccom = portfolio.capital_committed()
-    ccon = portfolio.capital_contributed()
-    cbal = portfolio.capital_balance()
+    totals = portfolio.totals()
+    rofc = totals["return_of_capital"]
+    ronc = totals["return_on_capital"]
+    ccom = totals["capital_committed"]
+    ccon = totals["capital_contributed"]
+    cbal = totals["capital_balance"]
     print(
         f"TOTAL\t${ccom:16.2f}\t${ccon:17.2f}\t${cbal:14.2f}\t"
         + f"${rofc:16.2f}\t${ronc:16.2f}"
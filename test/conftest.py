@@ -0,0 +1,37 @@
+"""
+Shared test configuration
+"""
+
+import copy
+import logging
+
+import pytest
+
+from crowdstreet import Portfolio
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _logging():
+    """
+    Log warnings and above; use pytest --log-level=DEBUG to see transaction logs
+    """
+    # pytest has already attached its capture handlers, so basicConfig() would
+    # do nothing: set the root logger level directly
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+@pytest.fixture(scope="module")
+def contributions():
+    """
+    Portfolio read from the contribution report only, shared by the tests of a
+    module: tests must not modify it
+    """
+    return Portfolio("test/data/contributions.tsv")
+
+
+@pytest.fixture
+def portfolio(contributions):
+    """
+    Copy of the shared contributions portfolio for tests that modify it
+    """
+    return copy.deepcopy(contributions)
@@ -6,6 +6,7 @@ import logging
 from datetime import date
 import pytest
 
+from crowdstreet import finances
 from crowdstreet.finances import (
     Portfolio,
     PortfolioException,
@@ -14,8 +15,7 @@ from crowdstreet.finances import (
     UnknownTransactionArgument,
 )
 
-LOG_LEVEL = logging.DEBUG
-logging.basicConfig(format="%(levelname)s:%(message)s", level=LOG_LEVEL)
+LOGGER = logging.getLogger(__name__)
 
 
 def test_init():
@@ -29,73 +29,114 @@ def test_init():
     init_fn = "test/data/contributions.tsv"
     portfolio = Portfolio(init_fn)
     for txn in portfolio.transactions():
-        print(txn)
+        LOGGER.debug("%s", txn)
 
     assert len(portfolio.sponsors) == 2
     assert len(portfolio.offerings) == 2
     assert len(portfolio.transactions()) == 5
 
 
-def test_capital_balance():
+@pytest.mark.parametrize(
+    "kwargs, balance",
+    [
+        ({}, -26500),
+        ({"investing_entity": "Alice"}, -21000),
+        ({"investing_entity": "Bob"}, 0),
+        ({"investing_entity": "Alice and Bob"}, -5500),
+        ({"sponsor": "ABC Holdings"}, -16500),
+        ({"offering": "Apartment ABC"}, -16500),
+        ({"investing_entity": "Alice", "offering": "Apartment ABC"}, -11000),
+        ({"sponsor": "Unknown Sponsor"}, 0),
+    ],
+)
+def test_capital_balance(contributions, kwargs, balance):
     """
     Test capital balance with various filters
     """
-    init_fn = "test/data/contributions.tsv"
-    portfolio = Portfolio(init_fn)
+    assert contributions.capital_balance(**kwargs) == balance
 
-    assert portfolio.capital_balance() == -26500
-    assert portfolio.capital_balance(investing_entity="Alice") == -21000
-    assert portfolio.capital_balance(investing_entity="Bob") == 0
-    assert portfolio.capital_balance(investing_entity="Alice and Bob") == -5500
-    assert portfolio.capital_balance(sponsor="ABC Holdings") == -16500
-    assert portfolio.capital_balance(offering="Apartment ABC") == -16500
+
+def test_unknown_argument(contributions):
+    """
+    Test unknown filter arguments are rejected
+    """
     with pytest.raises(UnknownTransactionArgument):
-        portfolio.capital_balance(unknown_arg="unknown")
+        contributions.capital_balance(unknown_arg="unknown")
 
 
-def test_date_filtering():
+def test_date_filtering(contributions):
     """
     Test start and end date filtering
     """
-    init_fn = "test/data/contributions.tsv"
-    portfolio = Portfolio(init_fn)
     start = date(2023, 1, 1)
-    assert len(portfolio.transactions(start_date=start)) == 1
+    assert len(contributions.transactions(start_date=start)) == 1
     end = date(2022, 1, 31)
-    assert len(portfolio.transactions(end_date=end)) == 2
+    assert len(contributions.transactions(end_date=end)) == 2
+
+
+@pytest.mark.parametrize(
+    "kwargs, balance",
+    [
+        ({"start_date": date(2023, 1, 1)}, -3500),
+        ({"end_date": date(2022, 1, 31)}, -20000),
+        ({"start_date": date(2022, 1, 1), "end_date": date(2022, 12, 31)}, -23000),
+        ({"start_date": date(2023, 1, 1), "end_date": date(2022, 1, 31)}, 0),
+        ({"end_date": date(2021, 12, 31)}, 0),
+    ],
+)
+def test_date_balance(contributions, kwargs, balance):
+    """
+    Test capital balance filtered by date only
+    """
+    assert contributions.capital_balance(**kwargs) == balance
+    assert contributions.totals(**kwargs)["capital_balance"] == balance
 
 
-def test_distributions():
+def test_distributions(portfolio):
     """
     Add distributions from distribution report
     """
     init_fn = "test/data/contributions.tsv"
-    portfolio = Portfolio(init_fn)
+    assert portfolio.capital_balance() == -26500
 
     with pytest.raises(DistributionException):
         portfolio.read_distributions(init_fn)
 
     dist_fn = "test/data/distributions.tsv"
 
-    sponsor = portfolio.sponsors.pop()
-    with pytest.raises(DistributionException):
-        portfolio.read_distributions(dist_fn)
-    portfolio.sponsors.add(sponsor)
+    with portfolio.without_sponsor("DEF Ventures"):
+        with pytest.raises(DistributionException):
+            portfolio.read_distributions(dist_fn)
+    assert len(portfolio.sponsors) == 2
+    assert len(portfolio.transactions()) == 5
 
-    offering = portfolio.offerings.pop()
-    with pytest.raises(DistributionException):
-        portfolio.read_distributions(dist_fn)
-    portfolio.offerings.add(offering)
+    with portfolio.without_offering("DEF Corporate Park"):
+        with pytest.raises(DistributionException):
+            portfolio.read_distributions(dist_fn)
+    assert len(portfolio.offerings) == 2
 
     portfolio.read_distributions(dist_fn)
 
-    print(portfolio.transactions())
-    print(len(portfolio.transactions()))
+    LOGGER.debug("%s", portfolio.transactions())
     assert len(portfolio.transactions()) == 10
-    print(portfolio.capital_balance())
     assert portfolio.capital_balance() == -26100
 
 
+def test_invalid_last_distribution(portfolio, tmp_path):
+    """
+    Test nothing is added when only the last distribution of a report is invalid
+    """
+    dist_fn = tmp_path / "distributions.tsv"
+    with open("test/data/distributions.tsv", encoding="utf8") as fid:
+        lines = fid.read().splitlines()
+    lines[-1] = lines[-1].replace("ABC Holdings", "Unknown Sponsor")
+    dist_fn.write_text("\n".join(lines) + "\n", encoding="utf8")
+    with pytest.raises(DistributionException):
+        portfolio.read_distributions(str(dist_fn))
+    assert len(portfolio.transactions()) == 5
+    assert portfolio.capital_balance() == -26500
+
+
 def test_bad_contributions():
     """
     Test for bad format of contributions data input
@@ -105,12 +146,10 @@ def test_bad_contributions():
         portfolio = Portfolio(init_fn)
 
 
-def test_summary():
+def test_summary(portfolio):
     """
     Test save summary with options
     """
-    init_fn = "test/data/contributions.tsv"
-    portfolio = Portfolio(init_fn)
     dist_fn = "test/data/distributions.tsv"
     portfolio.read_distributions(dist_fn)
 
@@ -126,43 +165,84 @@ def test_summary():
     n4 = portfolio.save_summary(sum_fn, start_date=start_date, end_date=end_date)
     assert n4 == 4
 
+    with pytest.raises(ValueError):
+        portfolio.save_summary(sum_fn, verbose=3)
 
-def test_transactions():
+
+def test_transactions(portfolio):
     """
     Test save summary with options
     """
-    init_fn = "test/data/contributions.tsv"
-    portfolio = Portfolio(init_fn)
     dist_fn = "test/data/distributions.tsv"
     portfolio.read_distributions(dist_fn)
-    for idx, txn in enumerate(portfolio.transactions()):
-        if idx == 0:
-            print(txn.headers())
-        print(txn.to_tsv())
+    lines = portfolio.to_tsv_lines()
+    for line in lines:
+        LOGGER.debug(line)
+    assert len(lines) == len(portfolio.transactions()) + 1
+    assert lines[1] == portfolio.transactions()[0].to_tsv()
+    assert len(portfolio.to_tsv_lines(",", investing_entity="Bob")) == 1
     with pytest.raises(UnknownTransactionArgument):
         portfolio.transactions(unknown_arg=1)
 
 
-def test_capital_calls():
+def test_capital_calls(contributions):
     """Test capital committed vs capital contributed"""
-    init_fn = "test/data/contributions.tsv"
-    portfolio = Portfolio(init_fn)
-    committed = portfolio.capital_committed(
+    committed = contributions.capital_committed(
         investing_entity="Alice", sponsor="ABC Holdings"
     )
-    contributed = portfolio.capital_contributed(
+    contributed = contributions.capital_contributed(
         investing_entity="Alice", sponsor="ABC Holdings"
     )
 
     assert contributed - committed == -1000
 
 
+def test_totals(portfolio):
+    """Test all sums from a single filtering pass match the aggregators"""
+    portfolio.read_distributions("test/data/distributions.tsv")
+    for kwargs in ({}, {"investing_entity": "Alice", "end_date": date(2022, 11, 1)}):
+        totals = portfolio.totals(**kwargs)
+        assert totals["capital_balance"] == portfolio.capital_balance(**kwargs)
+        assert totals["distributions"] == portfolio.distributions(**kwargs)
+    assert portfolio.totals()["return_on_capital"] == 1400
+
+
+def test_csv_report(tmp_path):
+    """Test reading comma delimited reports"""
+    init_fn = tmp_path / "contributions.csv"
+    with open("test/data/contributions.tsv", encoding="utf8") as fid:
+        init_fn.write_text(fid.read().replace("\t", ","), encoding="utf8")
+    portfolio = Portfolio(str(init_fn))
+    assert len(portfolio.transactions()) == 5
+    assert portfolio.capital_balance() == -26500
+
+
+def test_sub_cent_amounts(tmp_path):
+    """Test amounts with fractional cents are summed before rounding"""
+    init_fn = tmp_path / "contributions.tsv"
+    with open("test/data/contributions.tsv", encoding="utf8") as fid:
+        data = fid.read()
+    data = data.replace("\t3500\t", "\t3500.004\t").replace("\t1000\t", "\t1000.003\t")
+    init_fn.write_text(data, encoding="utf8")
+    portfolio = Portfolio(str(init_fn))
+    for kwargs in ({}, {"sponsor": "ABC Holdings"}, {"end_date": date(2023, 12, 31)}):
+        balance = portfolio.capital_balance(**kwargs)
+        txns = portfolio.transactions(**kwargs)
+        assert balance == round(sum(t.capital for t in txns), 2)
+    assert portfolio.capital_balance() == -26500.01
+    assert portfolio.capital_committed() == -25500.0
+    portfolio.read_distributions("test/data/distributions.tsv")
+    assert portfolio.capital_balance() == -26100.01
+
+
+def test_buffered_read(monkeypatch):
+    """Test reading reports too large to read into memory at once"""
+    monkeypatch.setattr(finances, "READ_ALL_SIZE", 0)
+    init_fn = "test/data/contributions.tsv"
+    portfolio = Portfolio(init_fn)
+    portfolio.read_distributions("test/data/distributions.tsv")
+    assert len(portfolio.transactions()) == 10
+
+
 if __name__ == "__main__":  # pragma: no cover
-    test_init()
-    test_capital_balance()
-    test_date_filtering()
-    test_distributions()
-    test_bad_contributions()
-    test_summary()
-    test_transactions()
-    test_capital_calls()
+    pytest.main([__file__])